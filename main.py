@@ -10,30 +10,81 @@ Usage:
 
 import argparse
 import asyncio
+import json
 import logging
 import os
 import signal
 import sys
+import tempfile
 from pathlib import Path
 
-import yaml
-
-from src.opencode_client import OpenCodeClient
-from src.discord_bot import OpenCodeBot
-from src.api_server import start_api_server
-
 log = logging.getLogger("opencode_discord_bot")
 
 
 def load_config(path: Path) -> dict:
     log.info("Loading config from %s", path)
-    with open(path) as f:
-        config = yaml.safe_load(f)
+    cache_path = path.with_suffix(path.suffix + ".cache.json")
+
+    # Reuse the JSON cache only if it was built from this exact YAML file.
+    # Size + nanosecond mtime rather than "cache is newer", so restoring an
+    # older config (cp -p, rsync -a, tar x) never serves stale values.
+    try:
+        st = path.stat()
+        source = [st.st_mtime_ns, st.st_size]
+        with open(cache_path, "rb") as f:
+            cached = json.load(f)
+        if cached.get("source") == source:
+            config = cached["config"]
+            log.debug("Config loaded from cache %s", cache_path)
+            log.debug("Config sections: %s", list(config.keys()))
+            return config
+        log.debug("Config cache %s is stale, parsing YAML", cache_path)
+    except (OSError, ValueError, AttributeError, KeyError) as exc:
+        log.debug("Config cache unusable (%s), parsing YAML", exc)
+
+    # Imported lazily: a cache hit never needs PyYAML
+    import yaml
+
+    try:
+        from yaml import CSafeLoader as Loader
+    except ImportError:  # PyYAML built without libyaml
+        from yaml import SafeLoader as Loader
+
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        config = yaml.load(f, Loader=Loader)
     log.debug("Config sections: %s", list(config.keys()))
+    _write_config_cache(cache_path, config, [st.st_mtime_ns, st.st_size])
     return config
 
 
+def _write_config_cache(cache_path: Path, config: dict, source: list[int]) -> None:
+    """Atomically write *config* as JSON next to the YAML file.
+
+    *source* is the YAML file's ``[st_mtime_ns, st_size]`` at parse time.
+    """
+    try:
+        fd, tmp = tempfile.mkstemp(dir=cache_path.parent, prefix=cache_path.name)
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"source": source, "config": config}, f)
+            os.replace(tmp, cache_path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        log.debug("Config cache written to %s", cache_path)
+    except (OSError, TypeError, ValueError) as exc:
+        # Read-only mounts or non-JSON values (e.g. YAML dates) — just skip it
+        log.debug("Could not write config cache %s: %s", cache_path, exc)
+
+
 async def run(config: dict) -> None:
+    # Heavy imports (discord.py, aiohttp) are deferred so that --help and
+    # config errors return immediately.
+    from src.api_server import start_api_server
+    from src.discord_bot import OpenCodeBot
+    from src.opencode_client import OpenCodeClient, close_shared_connector
+
     dc = config.get("discord", {})
     oc = config.get("opencode", {})
 
@@ -62,6 +113,7 @@ async def run(config: dict) -> None:
         opencode=client,
         allowed_channels=dc.get("allowed_channels"),
         command_prefix=dc.get("prefix", "!"),
+        stream_replies=dc.get("stream_replies", False),
     )
 
     # Graceful shutdown
@@ -128,6 +180,7 @@ async def run(config: dict) -> None:
         await bot.cleanup_sessions()
         await bot.close()
         await client.stop_server()
+        await close_shared_connector()
         log.info("Goodbye.")
 
 
@@ -163,7 +216,13 @@ def main() -> None:
         log.error("discord.token is required in config.yaml")
         sys.exit(1)
 
-    asyncio.run(run(config))
+    try:
+        import uvloop
+    except ImportError:  # optional speedup
+        asyncio.run(run(config))
+    else:
+        log.debug("Using uvloop event loop")
+        uvloop.run(run(config))
 
 
 if __name__ == "__main__":
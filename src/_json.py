@@ -0,0 +1,34 @@
+"""
+JSON helpers
+
+Uses ``orjson`` when it is installed and falls back to the standard
+library otherwise. ``dumps`` always returns ``bytes`` so callers can hand
+the result straight to aiohttp; ``dumps_str`` suits APIs that want ``str``
+(e.g. aiohttp's ``json_serialize``).
+"""
+
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+if orjson is not None:
+    loads = orjson.loads
+
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+else:
+    import json
+
+    def loads(data: bytes | str) -> Any:
+        return json.loads(data)
+
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def dumps_str(obj: Any) -> str:
+    return dumps(obj).decode()
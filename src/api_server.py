@@ -19,31 +19,119 @@ GET  /api/health
 from __future__ import annotations
 
 import logging
-from typing import TYPE_CHECKING
+import secrets
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Annotated
 
 from aiohttp import web
 
+from . import _json
+
+try:
+    import msgspec
+except ImportError:  # optional speedup
+    msgspec = None
+
 if TYPE_CHECKING:
     from .discord_bot import OpenCodeBot
 
 log = logging.getLogger(__name__)
 
+# Pre-serialized body for the constant health response.
+_HEALTH_BODY = b'{"ok": true}'
+
+
+# ------------------------------------------------------------------ #
+#  Request schema
+# ------------------------------------------------------------------ #
+
+def _trigger_error(raw: bytes) -> str:
+    """Describe why *raw* is not a valid trigger body.
+
+    Shared by both parsers below so the 400 messages don't depend on
+    whether msgspec is installed.
+    """
+    try:
+        body = _json.loads(raw)
+    except ValueError:
+        return "Invalid JSON body"
+    if not isinstance(body, dict):
+        return "JSON body must be an object"
+    for name in ("channel_name", "prompt"):
+        value = body.get(name)
+        if not value or not isinstance(value, str):
+            return f"'{name}' (string) is required"
+    category = body.get("category")
+    if category is not None and not isinstance(category, str):
+        return "'category' must be a string or null"
+    return "Invalid trigger body"
+
+
+if msgspec is not None:
+    _RequiredStr = Annotated[str, msgspec.Meta(min_length=1)]
+
+    class TriggerRequest(msgspec.Struct):
+        """Body of ``POST /api/trigger``."""
+
+        channel_name: _RequiredStr
+        prompt: _RequiredStr
+        category: str | None = None
+
+    _trigger_decoder = msgspec.json.Decoder(TriggerRequest)
+
+    def _parse_trigger(raw: bytes) -> TriggerRequest:
+        """Decode and validate a trigger body in a single pass."""
+        try:
+            return _trigger_decoder.decode(raw)
+        except msgspec.DecodeError:
+            message = _trigger_error(raw)
+            log.warning("Trigger rejected — %s", message)
+            raise web.HTTPBadRequest(text=message)
+
+else:
+
+    @dataclass(slots=True)
+    class TriggerRequest:
+        """Body of ``POST /api/trigger``."""
+
+        channel_name: str
+        prompt: str
+        category: str | None = None
+
+    def _parse_trigger(raw: bytes) -> TriggerRequest:
+        """Decode and validate a trigger body."""
+        try:
+            body = _json.loads(raw)
+        except ValueError:
+            body = None
+        if isinstance(body, dict):
+            channel_name = body.get("channel_name")
+            prompt = body.get("prompt")
+            category = body.get("category")
+            if (
+                channel_name and isinstance(channel_name, str)
+                and prompt and isinstance(prompt, str)
+                and (category is None or isinstance(category, str))
+            ):
+                return TriggerRequest(channel_name, prompt, category)
+
+        message = _trigger_error(raw)
+        log.warning("Trigger rejected — %s", message)
+        raise web.HTTPBadRequest(text=message)
+
 
 def _build_app(bot: OpenCodeBot, secret_key: str) -> web.Application:
     """Construct the aiohttp Application with routes and middleware."""
+    # Full header value, pre-encoded once for constant-time comparison
+    expected_header = f"Bearer {secret_key}".encode()
 
     @web.middleware
     async def auth_middleware(
         request: web.Request,
         handler: web.RequestHandler,
     ) -> web.StreamResponse:
-        # Health endpoint is public
-        if request.path == "/api/health":
-            log.debug("Health check from %s (no auth required)", request.remote)
-            return await handler(request)
-
-        auth_header = request.headers.get("Authorization", "")
-        if not auth_header.startswith("Bearer "):
+        auth_header = request.headers.getone("Authorization", None)
+        if auth_header is None or not auth_header.startswith("Bearer "):
             log.warning(
                 "Unauthorized request to %s from %s — missing Bearer token",
                 request.path,
@@ -51,8 +139,7 @@ def _build_app(bot: OpenCodeBot, secret_key: str) -> web.Application:
             )
             raise web.HTTPUnauthorized(text="Missing Bearer token")
 
-        token = auth_header.removeprefix("Bearer ").strip()
-        if token != secret_key:
+        if not secrets.compare_digest(auth_header.encode(), expected_header):
             log.warning(
                 "Forbidden request to %s from %s — invalid API key",
                 request.path,
@@ -60,14 +147,20 @@ def _build_app(bot: OpenCodeBot, secret_key: str) -> web.Application:
             )
             raise web.HTTPForbidden(text="Invalid API key")
 
-        log.debug("Authenticated request to %s from %s", request.path, request.remote)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Authenticated request to %s from %s", request.path, request.remote)
         return await handler(request)
 
-    app = web.Application(middlewares=[auth_middleware])
-    app["bot"] = bot
+    # Protected routes live on a sub-application so the auth middleware
+    # never runs for the (public, frequently polled) health endpoint.
+    protected = web.Application(middlewares=[auth_middleware])
+    protected["bot"] = bot
+    protected.router.add_post("/trigger", _handle_trigger)
 
+    app = web.Application()
+    app["bot"] = bot
     app.router.add_get("/api/health", _handle_health)
-    app.router.add_post("/api/trigger", _handle_trigger)
+    app.add_subapp("/api", protected)
     log.debug("Registered API routes: GET /api/health, POST /api/trigger")
 
     return app
@@ -80,7 +173,7 @@ def _build_app(bot: OpenCodeBot, secret_key: str) -> web.Application:
 
 async def _handle_health(request: web.Request) -> web.Response:
     log.debug("Health check OK")
-    return web.json_response({"ok": True})
+    return web.Response(body=_HEALTH_BODY, content_type="application/json")
 
 
 async def _handle_trigger(request: web.Request) -> web.Response:
@@ -90,36 +183,20 @@ async def _handle_trigger(request: web.Request) -> web.Response:
         log.warning("Trigger rejected — Discord bot is not ready yet")
         raise web.HTTPServiceUnavailable(text="Discord bot is not ready yet")
 
-    try:
-        body = await request.json()
-    except Exception:
-        log.warning("Trigger rejected — invalid JSON body from %s", request.remote)
-        raise web.HTTPBadRequest(text="Invalid JSON body")
-
-    channel_name = body.get("channel_name")
-    prompt = body.get("prompt")
-
-    if not channel_name or not isinstance(channel_name, str):
-        log.warning("Trigger rejected — missing or invalid 'channel_name'")
-        raise web.HTTPBadRequest(text="'channel_name' (string) is required")
-    if not prompt or not isinstance(prompt, str):
-        log.warning("Trigger rejected — missing or invalid 'prompt'")
-        raise web.HTTPBadRequest(text="'prompt' (string) is required")
-
-    category = body.get("category")
+    req = _parse_trigger(await request.read())
 
     log.info(
         "API trigger: channel_name=%s, category=%s, prompt=%s",
-        channel_name,
-        category,
-        prompt[:80],
+        req.channel_name,
+        req.category,
+        req.prompt[:80],
     )
 
     try:
         result = await bot.create_session_channel(
-            channel_name=channel_name,
-            prompt=prompt,
-            category=category,
+            channel_name=req.channel_name,
+            prompt=req.prompt,
+            category=req.category,
         )
     except RuntimeError as exc:
         raise web.HTTPServiceUnavailable(text=str(exc))
@@ -132,7 +209,7 @@ async def _handle_trigger(request: web.Request) -> web.Response:
         result.get("channel_name"),
         result.get("session_id", "")[:8],
     )
-    return web.json_response(result)
+    return web.Response(body=_json.dumps(result), content_type="application/json")
 
 
 # ------------------------------------------------------------------ #
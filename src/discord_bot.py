@@ -5,10 +5,22 @@ Bridges Discord channels to OpenCode sessions.
 Each channel that starts a session gets its own OpenCode session ID.
 Messages in that channel are forwarded to OpenCode and the response
 is posted back.
+
+Performance
+-----------
+This module is I/O-bound: nearly all wall-clock time goes to HTTP round
+trips to Discord and to ``opencode serve``, not to Python code. Optimization
+effort belongs where round trips are saved — the pooled keep-alive session
+in ``OpenCodeClient``, the guild/category/channel-name caches here, skipping
+the typing indicator for fast replies, and streaming replies as they are
+generated — rather than in CPU micro-optimizations that save microseconds.
 """
 
+import asyncio
+import contextlib
 import logging
-from typing import Any
+from collections.abc import Callable, Coroutine, Iterator
+from typing import Any, TypeVar
 
 import discord
 from discord.ext import commands
@@ -17,33 +29,76 @@ from .opencode_client import OpenCodeClient
 
 log = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 # Discord limits messages to 2 000 characters.
 DISCORD_MAX_LEN = 2000
 
+# Only show the typing indicator for OpenCode replies slower than this (s).
+TYPING_DELAY = 0.5
+
+# When streaming, flush at a paragraph break once this much text is buffered.
+STREAM_FLUSH_MIN = 500
+
+# Give up on a streamed reply (and abort it) after this long (s).
+STREAM_TIMEOUT = 600
+
 
-def chunk_message(text: str, limit: int = DISCORD_MAX_LEN) -> list[str]:
-    """Split a long message into chunks that fit Discord's limit.
+def iter_chunks(text: str, limit: int = DISCORD_MAX_LEN) -> Iterator[str]:
+    """Lazily yield chunks of *text* that fit Discord's limit.
 
-    Tries to split on newlines first, then hard-wraps.
+    Tries to split on newlines first, then hard-wraps. Chunks are produced
+    on demand, so the first one can be sent while the rest of the text has
+    not been sliced yet.
     """
-    if len(text) <= limit:
-        return [text]
+    start = 0
+    n = len(text)
+    if n <= limit:
+        yield text
+        return
+
+    while start < n:
+        end = start + limit
+        if end >= n:
+            yield text[start:]
+            return
+
+        # Try to find a newline to break on. Newlines in the first half of
+        # the window would be rejected anyway, so don't scan that far back.
+        split_at = text.rfind("\n", start + limit // 2, end)
+        if split_at == -1:
+            split_at = end
+
+        yield text[start:split_at]
+
+        # Skip the newlines we split on without copying the remainder
+        while split_at < n and text[split_at] == "\n":
+            split_at += 1
+        start = split_at
+
 
-    chunks: list[str] = []
-    while text:
-        if len(text) <= limit:
-            chunks.append(text)
-            break
+class _Lazy:
+    """Log argument whose string form is only computed if the record is emitted."""
 
-        # Try to find a newline to break on
-        split_at = text.rfind("\n", 0, limit)
-        if split_at == -1 or split_at < limit // 2:
-            split_at = limit
+    __slots__ = ("fn",)
 
-        chunks.append(text[:split_at])
-        text = text[split_at:].lstrip("\n")
+    def __init__(self, fn: Callable[[], str]):
+        self.fn = fn
 
-    return chunks
+    def __str__(self) -> str:
+        return self.fn()
+
+
+class SessionRecord:
+    """An OpenCode session bound to a Discord channel."""
+
+    __slots__ = ("session_id", "channel_name", "short_id")
+
+    def __init__(self, session_id: str, channel_name: str):
+        self.session_id = session_id
+        self.channel_name = channel_name
+        # Shortened ID used in logs and user-facing messages
+        self.short_id = session_id[:8]
 
 
 class OpenCodeBot(commands.Bot):
@@ -55,6 +110,7 @@ class OpenCodeBot(commands.Bot):
         *,
         allowed_channels: list[str] | None = None,
         command_prefix: str = "!",
+        stream_replies: bool = False,
         **kwargs: Any,
     ):
         intents = discord.Intents.default()
@@ -67,10 +123,23 @@ class OpenCodeBot(commands.Bot):
         )
 
         self.opencode = opencode
-        self.allowed_channels: set[str] = set(allowed_channels or [])
-
-        # channel_id  ->  opencode session_id
-        self._sessions: dict[int, str] = {}
+        self.stream_replies = stream_replies
+        self._prefix = command_prefix
+        self.allowed_channels: frozenset[str] = frozenset(allowed_channels or ())
+        self._allow_all = not self.allowed_channels
+        # IDs of channels already matched by name (see _channel_allowed)
+        self._allowed_channel_ids: set[int] = set()
+
+        # Guild / category lookups for create_session_channel, invalidated
+        # by the guild and channel events below
+        self._guild_cache: discord.Guild | None = None
+        self._category_cache: dict[str, discord.CategoryChannel] = {}
+
+        # channel_id  ->  bound session
+        self._sessions: dict[int, SessionRecord] = {}
+        # Pre-bound lookup for the message hot path. _sessions must only be
+        # mutated in place (never reassigned) for this to stay valid.
+        self._session_for = self._sessions.get
 
         log.info(
             "Bot initialized (prefix=%r, allowed_channels=%s)",
@@ -87,8 +156,36 @@ class OpenCodeBot(commands.Bot):
 
     async def on_ready(self) -> None:
         log.info("Discord bot connected as %s (id=%s)", self.user, self.user.id)
-        guilds = [g.name for g in self.guilds]
-        log.info("Serving in guilds: %s", ", ".join(guilds))
+        log.info(
+            "Serving in guilds: %s",
+            _Lazy(lambda: ", ".join(g.name for g in self.guilds)),
+        )
+        self._invalidate_guild_cache()
+
+    async def on_guild_available(self, guild: discord.Guild) -> None:
+        self._invalidate_guild_cache()
+
+    async def on_guild_join(self, guild: discord.Guild) -> None:
+        self._invalidate_guild_cache()
+
+    async def on_guild_remove(self, guild: discord.Guild) -> None:
+        self._invalidate_guild_cache()
+
+    async def on_guild_channel_update(
+        self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel
+    ) -> None:
+        # A renamed channel must be re-checked against the allowed names
+        if before.name != after.name:
+            self._allowed_channel_ids.discard(after.id)
+            self._forget_category(before)
+            # Keep !status accurate even if nothing is relayed after the rename
+            record = self._sessions.get(after.id)
+            if record is not None:
+                record.channel_name = after.name
+
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel) -> None:
+        self._allowed_channel_ids.discard(channel.id)
+        self._forget_category(channel)
 
     async def on_command_error(
         self, ctx: commands.Context, error: commands.CommandError
@@ -115,11 +212,12 @@ class OpenCodeBot(commands.Bot):
                 log.info("!start denied — #%s not in allowed channels", ctx.channel.name)
                 return
 
-            if ctx.channel.id in self._sessions:
+            active = self._sessions.get(ctx.channel.id)
+            if active is not None:
                 log.info(
                     "!start rejected — session already active in #%s (session=%s)",
                     ctx.channel.name,
-                    self._sessions[ctx.channel.id][:8],
+                    active.short_id,
                 )
                 await ctx.send("\u26a0\ufe0f A session is already active in this channel. "
                                "Use `!stop` first to end it.")
@@ -131,12 +229,12 @@ class OpenCodeBot(commands.Bot):
                 session = await self.opencode.create_session(title=session_title)
 
             session_id = session.get("id") or session.get("ID")
-            self._sessions[ctx.channel.id] = session_id
+            record = self._bind_session(ctx.channel, session_id)
             log.info(
-                "Session created: %s for #%s", session_id, ctx.channel.name
+                "Session created: %s for #%s", record.short_id, ctx.channel.name
             )
             await ctx.send(
-                f"✅ OpenCode session started (`{session_id[:8]}…`).\n"
+                f"✅ OpenCode session started (`{record.short_id}…`).\n"
                 f"Send messages normally — I'll forward them to OpenCode."
             )
 
@@ -148,19 +246,13 @@ class OpenCodeBot(commands.Bot):
                 log.info("!stop denied — #%s not in allowed channels", ctx.channel.name)
                 return
 
-            session_id = self._sessions.pop(ctx.channel.id, None)
-            if session_id is None:
+            record = self._unbind_session(ctx.channel.id)
+            if record is None:
                 log.info("!stop — no active session in #%s", ctx.channel.name)
                 await ctx.send("ℹ️ No active session in this channel.")
                 return
-
-            log.info("Stopping session %s in #%s", session_id[:8], ctx.channel.name)
-            try:
-                await self.opencode.delete_session(session_id)
-                log.info("Session %s deleted successfully", session_id[:8])
-            except Exception as exc:
-                log.warning("Failed to delete session %s: %s", session_id, exc)
-
+            log.info("Stopping session %s in #%s", record.short_id, ctx.channel.name)
+            await self._safe_delete(record)
             await ctx.send("🛑 Session ended.")
 
         @self.command(name="status")
@@ -178,27 +270,32 @@ class OpenCodeBot(commands.Bot):
 
             log.debug("Reporting %d active session(s)", len(self._sessions))
 
-            lines = ["**Active sessions:**"]
-            for ch_id, sid in self._sessions.items():
-                channel = self.get_channel(ch_id)
-                ch_name = channel.name if channel else str(ch_id)
-                lines.append(f"• #{ch_name} → `{sid[:8]}…`")
-            await ctx.send("\n".join(lines))
+            body = "\n".join(
+                f"• #{r.channel_name} → `{r.short_id}…`"
+                for r in self._sessions.values()
+            )
+            # Many sessions can exceed Discord's message limit
+            await self._send_chunks(ctx, "**Active sessions:**\n" + body)
 
     # ------------------------------------------------------------------ #
     #  Message relay
     # ------------------------------------------------------------------ #
 
     async def on_message(self, message: discord.Message) -> None:
-        # Let commands be processed first
-        await self.process_commands(message)
-
-        # Ignore bots, DMs, and command messages
-        if message.author.bot:
+        # Only messages with our prefix can be commands; hand those to the
+        # command dispatcher and skip its parsing for plain chat.
+        if message.content.startswith(self._prefix):
+            await self.process_commands(message)
             return
-        if not isinstance(message.channel, discord.TextChannel):
+
+        # Only relay if there's an active session for this channel. This is
+        # the most selective check, so it runs first.
+        record = self._session_for(message.channel.id)
+        if record is None:
             return
-        if message.content.startswith(self.command_prefix):
+
+        # Ignore bots and DMs
+        if message.author.bot or not isinstance(message.channel, discord.TextChannel):
             return
         if not self._channel_allowed(message.channel):
             log.debug(
@@ -207,14 +304,8 @@ class OpenCodeBot(commands.Bot):
             )
             return
 
-        # Only relay if there's an active session for this channel
-        session_id = self._sessions.get(message.channel.id)
-        if session_id is None:
-            log.debug(
-                "Ignoring message in #%s — no active session",
-                message.channel.name,
-            )
-            return
+        # Keep the cached name fresh in case the channel was renamed
+        record.channel_name = message.channel.name
 
         user_text = message.content.strip()
         if not user_text:
@@ -226,36 +317,96 @@ class OpenCodeBot(commands.Bot):
             message.author.display_name,
             user_text[:80],
         )
-        log.debug(
-            "Relaying message to session %s (full length=%d)",
-            session_id[:8],
-            len(user_text),
-        )
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(
+                "Relaying message to session %s (full length=%d)",
+                record.short_id,
+                len(user_text),
+            )
 
-        async with message.channel.typing():
-            try:
-                response = await self.opencode.send_message(session_id, user_text)
-                reply_text = OpenCodeClient.extract_text(response)
-                log.debug(
-                    "Received response from session %s (length=%d)",
-                    session_id[:8],
-                    len(reply_text),
-                )
-            except Exception as exc:
-                log.error("OpenCode request failed: %s", exc, exc_info=True)
-                await message.channel.send(f"⚠️ OpenCode error: {exc}")
-                return
+        await self._exchange(record, user_text, message.channel)
 
-        # Send the response, chunked if necessary
-        chunks = chunk_message(reply_text)
-        if len(chunks) > 1:
+    async def _exchange(
+        self, record: SessionRecord, text: str, destination: discord.abc.Messageable
+    ) -> str | None:
+        """Send *text* to OpenCode and post the reply to *destination*.
+
+        Returns ``None`` on success, or the error message (already reported
+        in *destination*) if the OpenCode request failed.
+        """
+        session_id = record.session_id
+        try:
+            if self.stream_replies:
+                async with destination.typing():
+                    try:
+                        async with asyncio.timeout(STREAM_TIMEOUT) as deadline:
+                            await self._relay_stream(destination, session_id, text)
+                    except TimeoutError:
+                        # aiohttp's connect/read timeouts are TimeoutErrors
+                        # too; only our own deadline means a stalled stream
+                        if not deadline.expired():
+                            raise
+                        # The stream only ends on session.idle/error; don't
+                        # wait forever if those never arrive
+                        await self._safe_abort(record)
+                        raise TimeoutError(
+                            f"no complete reply within {STREAM_TIMEOUT}s"
+                        ) from None
+                return None
+
+            response = await self._with_typing(
+                destination, self.opencode.send_message(session_id, text)
+            )
+            reply_text = OpenCodeClient.extract_text(response)
+        except Exception as exc:
+            log.error("OpenCode request failed: %s", exc, exc_info=True)
+            await destination.send(f"⚠️ OpenCode error: {exc}")
+            return str(exc)
+
+        if log.isEnabledFor(logging.DEBUG):
             log.debug(
-                "Sending response in %d chunks to #%s",
-                len(chunks),
-                message.channel.name,
+                "Received response from session %s (length=%d)",
+                record.short_id,
+                len(reply_text),
             )
-        for chunk in chunks:
-            await message.channel.send(chunk)
+
+        await self._send_chunks(destination, reply_text)
+        return None
+
+    async def _relay_stream(
+        self, channel: discord.abc.Messageable, session_id: str, text: str
+    ) -> None:
+        """Relay *text* to OpenCode and post the reply while it is generated.
+
+        Full-size chunks are sent as soon as they are available, and a
+        paragraph break flushes the buffer once it holds at least
+        ``STREAM_FLUSH_MIN`` characters, so sending overlaps generation.
+        """
+        buffer = ""
+        sent_any = False
+        async for delta in self.opencode.stream_message(session_id, text):
+            buffer += delta
+            if not sent_any:
+                buffer = buffer.lstrip()
+
+            while len(buffer) > DISCORD_MAX_LEN:
+                chunk = next(iter_chunks(buffer))
+                await channel.send(chunk)
+                sent_any = True
+                buffer = buffer[len(chunk):].lstrip()
+
+            if len(buffer) >= STREAM_FLUSH_MIN:
+                split_at = buffer.rfind("\n\n")
+                if split_at > 0:
+                    await channel.send(buffer[:split_at])
+                    sent_any = True
+                    buffer = buffer[split_at:].lstrip()
+
+        buffer = buffer.strip()
+        if buffer:
+            await self._send_chunks(channel, buffer)
+        elif not sent_any:
+            await channel.send("(no text in response)")
 
     # ------------------------------------------------------------------ #
     #  Programmatic API
@@ -299,12 +450,15 @@ class OpenCodeBot(commands.Bot):
         # Resolve or create category
         discord_category: discord.CategoryChannel | None = None
         if category:
-            discord_category = discord.utils.get(guild.categories, name=category)
+            discord_category = self._category_cache.get(category)
+            if discord_category is None:
+                discord_category = discord.utils.get(guild.categories, name=category)
             if discord_category is None:
                 log.info("Creating category '%s' in guild '%s'", category, guild.name)
                 discord_category = await guild.create_category(category)
             else:
                 log.debug("Using existing category '%s' (id=%s)", category, discord_category.id)
+            self._category_cache[category] = discord_category
 
         # Create the text channel
         channel = await guild.create_text_channel(
@@ -317,36 +471,26 @@ class OpenCodeBot(commands.Bot):
         log.debug("Creating OpenCode session for #%s", channel.name)
         session = await self.opencode.create_session(title=f"discord-{channel.name}")
         session_id = session.get("id") or session.get("ID")
-        self._sessions[channel.id] = session_id
+        record = self._bind_session(channel, session_id)
         log.info("Session %s bound to #%s", session_id, channel.name)
 
         # Send the prompt and post the response
-        log.debug("Sending initial prompt to session %s (length=%d)", session_id[:8], len(prompt))
-        try:
-            response = await self.opencode.send_message(session_id, prompt)
-            reply_text = OpenCodeClient.extract_text(response)
-            log.debug(
-                "Received initial response from session %s (length=%d)",
-                session_id[:8],
-                len(reply_text),
-            )
-        except Exception as exc:
-            log.error("OpenCode request failed: %s", exc, exc_info=True)
-            await channel.send(f"⚠️ OpenCode error: {exc}")
+        log.debug(
+            "Sending initial prompt to session %s (length=%d)", record.short_id, len(prompt)
+        )
+        error = await self._exchange(record, prompt, channel)
+        if error is not None:
             return {
                 "channel_id": channel.id,
                 "channel_name": channel.name,
                 "session_id": session_id,
-                "error": str(exc),
+                "error": error,
             }
 
-        for chunk in chunk_message(reply_text):
-            await channel.send(chunk)
-
         log.info(
             "create_session_channel completed: #%s → session %s",
             channel.name,
-            session_id[:8],
+            record.short_id,
         )
         return {
             "channel_id": channel.id,
@@ -365,34 +509,112 @@ class OpenCodeBot(commands.Bot):
             log.info("No active sessions to clean up")
             return
         log.info("Cleaning up %d active session(s) …", count)
-        for ch_id, session_id in list(self._sessions.items()):
-            try:
-                await self.opencode.delete_session(session_id)
-                log.info("Cleaned up session %s", session_id)
-            except Exception as exc:
-                log.warning("Failed to cleanup session %s: %s", session_id, exc)
+        # Detach the sessions before awaiting so a re-entrant call (or a
+        # command racing shutdown) can't delete them a second time.
+        pending = tuple(self._sessions.values())
         self._sessions.clear()
+        await asyncio.gather(*map(self._safe_delete, pending))
         log.info("Session cleanup complete")
 
+    async def _safe_abort(self, record: SessionRecord) -> None:
+        """Abort a running generation, logging (not raising) any failure."""
+        try:
+            await self.opencode.abort_session(record.session_id)
+        except Exception as exc:
+            log.warning("Failed to abort session %s: %s", record.short_id, exc)
+
+    async def _safe_delete(self, record: SessionRecord) -> None:
+        """Delete a single session, logging (not raising) any failure."""
+        try:
+            await self.opencode.delete_session(record.session_id)
+        except Exception as exc:
+            log.warning("Failed to delete session %s: %s", record.short_id, exc)
+
     # ------------------------------------------------------------------ #
     #  Helpers
     # ------------------------------------------------------------------ #
 
+    @staticmethod
+    async def _with_typing(
+        channel: discord.abc.Messageable, coro: Coroutine[Any, Any, T]
+    ) -> T:
+        """Await *coro*, showing a typing indicator only if it is slow.
+
+        Fast replies skip the extra ``/typing`` request to Discord entirely.
+        The indicator is best effort: if Discord rejects it, *coro* is still
+        awaited and its result returned.
+        """
+        task = asyncio.ensure_future(coro)
+        try:
+            done, _ = await asyncio.wait((task,), timeout=TYPING_DELAY)
+            if done:
+                return task.result()
+            async with contextlib.AsyncExitStack() as stack:
+                try:
+                    await stack.enter_async_context(channel.typing())
+                except discord.HTTPException as exc:
+                    log.debug("Typing indicator unavailable: %s", exc)
+                return await task
+        except BaseException:
+            # Never leave the request running unobserved
+            task.cancel()
+            raise
+
+    @staticmethod
+    async def _send_chunks(destination: discord.abc.Messageable, text: str) -> None:
+        """Send *text* to *destination*, split into Discord-sized chunks.
+
+        Chunks must arrive in order, so they are sent one at a time rather
+        than concurrently. discord.py's HTTP client already queues requests
+        per rate-limit bucket and retries on 429, so no extra limiter is
+        needed here.
+        """
+        # Common case: the whole reply fits in one message
+        if len(text) <= DISCORD_MAX_LEN:
+            await destination.send(text)
+            return
+        for chunk in iter_chunks(text):
+            await destination.send(chunk)
+
     def _get_guild(self) -> discord.Guild:
         """Return the first (and assumed only) guild the bot is in."""
-        if not self.guilds:
-            raise RuntimeError("Bot is not in any guild")
-        return self.guilds[0]
+        if self._guild_cache is None:
+            guilds = self.guilds
+            if not guilds:
+                raise RuntimeError("Bot is not in any guild")
+            self._guild_cache = guilds[0]
+        return self._guild_cache
+
+    def _invalidate_guild_cache(self) -> None:
+        """Forget the cached guild and its categories."""
+        self._guild_cache = None
+        self._category_cache.clear()
+
+    def _forget_category(self, channel: discord.abc.GuildChannel) -> None:
+        """Drop *channel* from the category cache if it is cached there."""
+        if not isinstance(channel, discord.CategoryChannel):
+            return
+        cached = self._category_cache.get(channel.name)
+        if cached is not None and cached.id == channel.id:
+            del self._category_cache[channel.name]
+
+    def _bind_session(
+        self, channel: discord.abc.GuildChannel, session_id: str
+    ) -> SessionRecord:
+        """Associate *session_id* with *channel*."""
+        record = SessionRecord(session_id, channel.name)
+        self._sessions[channel.id] = record
+        return record
+
+    def _unbind_session(self, channel_id: int) -> SessionRecord | None:
+        """Drop the session bound to *channel_id*, returning it if any."""
+        return self._sessions.pop(channel_id, None)
 
     def _channel_allowed(self, channel: discord.abc.GuildChannel) -> bool:
         """Return True if the bot should operate in this channel."""
-        if not self.allowed_channels:
-            return True  # no filter → allow all
-        allowed = channel.name in self.allowed_channels
-        if not allowed:
-            log.debug(
-                "Channel #%s not in allowed set %s",
-                channel.name,
-                self.allowed_channels,
-            )
-        return allowed
+        if self._allow_all or channel.id in self._allowed_channel_ids:
+            return True
+        if channel.name in self.allowed_channels:
+            self._allowed_channel_ids.add(channel.id)
+            return True
+        return False
@@ -7,13 +7,57 @@ via the REST API documented at https://opencode.ai/docs/server/.
 
 import asyncio
 import logging
+import os
 import signal
+from collections.abc import AsyncIterator
 from dataclasses import dataclass, field
 
 import aiohttp
 
+from . import _json
+
+try:
+    import ijson
+except ImportError:  # optional speedup
+    ijson = None
+
 log = logging.getLogger(__name__)
 
+# The health endpoint answers in milliseconds; don't let a hung probe linger
+_HEALTH_TIMEOUT = aiohttp.ClientTimeout(total=2)
+
+# The event stream stays open for the whole reply, so only bound the connect;
+# callers put an overall deadline around stream_message
+_EVENT_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=2, sock_read=None)
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Connection pool (and DNS cache) shared by every OpenCodeClient in the
+# process. Each client keeps its own session for its base URL and auth.
+_shared_connector: aiohttp.TCPConnector | None = None
+
+
+def _get_shared_connector() -> aiohttp.TCPConnector:
+    global _shared_connector
+    if _shared_connector is None or _shared_connector.closed:
+        log.debug("Creating shared HTTP connection pool")
+        _shared_connector = aiohttp.TCPConnector(
+            limit=100,
+            limit_per_host=32,
+            ttl_dns_cache=300,
+            keepalive_timeout=60,
+        )
+    return _shared_connector
+
+
+async def close_shared_connector() -> None:
+    """Close the process-wide connection pool (call once on shutdown)."""
+    global _shared_connector
+    if _shared_connector is not None and not _shared_connector.closed:
+        await _shared_connector.close()
+        log.debug("Shared HTTP connection pool closed")
+    _shared_connector = None
+
 
 @dataclass
 class OpenCodeClient:
@@ -31,6 +75,17 @@ class OpenCodeClient:
     _http: aiohttp.ClientSession | None = field(
         default=None, init=False, repr=False
     )
+    _drain_tasks: list[asyncio.Task] = field(
+        default_factory=list, init=False, repr=False
+    )
+    _headers: dict[str, str] = field(default_factory=dict, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        # Encode the Authorization header once rather than on every request
+        if self.username and self.password:
+            self._headers = {
+                "Authorization": aiohttp.BasicAuth(self.username, self.password).encode()
+            }
 
     # ------------------------------------------------------------------ #
     #  URL / auth helpers
@@ -40,20 +95,26 @@ class OpenCodeClient:
     def base_url(self) -> str:
         return f"http://{self.hostname}:{self.port}"
 
-    @property
-    def _auth(self) -> aiohttp.BasicAuth | None:
-        if self.username and self.password:
-            return aiohttp.BasicAuth(self.username, self.password)
-        return None
+    def _session(self) -> aiohttp.ClientSession:
+        """Return the long-lived HTTP session, creating it on first use.
 
-    @property
-    def http(self) -> aiohttp.ClientSession:
-        if self._http is None or self._http.closed:
+        Every API call goes through here. Connections come from a
+        process-wide pool and are kept alive and reused across requests, so
+        relayed messages don't pay a TCP handshake each time.
+        ``_close_http`` resets it.
+        """
+        if self._http is None:
             log.debug("Creating new HTTP session for %s", self.base_url)
             self._http = aiohttp.ClientSession(
                 base_url=self.base_url,
-                auth=self._auth,
-                timeout=aiohttp.ClientTimeout(total=120),
+                headers=self._headers,
+                # No overall cap: replies can take a while, but a dead socket
+                # or unreachable server should fail fast
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=2, sock_read=120),
+                connector=_get_shared_connector(),
+                connector_owner=False,
+                json_serialize=_json.dumps_str,
+                raise_for_status=True,
             )
         return self._http
 
@@ -76,64 +137,147 @@ class OpenCodeClient:
             str(self.port),
         ]
         log.info("Starting: %s  (cwd=%s)", " ".join(cmd), self.working_directory)
+        self._session()
 
         self._process = await asyncio.create_subprocess_exec(
             *cmd,
             cwd=self.working_directory,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
+            # Own process group, so stop_server can signal any workers too
+            start_new_session=True,
         )
         log.info("OpenCode server started (pid %s)", self._process.pid)
 
+        # Keep reading the pipes, otherwise the server blocks once one fills up
+        self._drain_tasks = [
+            asyncio.create_task(self._drain(self._process.stdout, logging.INFO)),
+            asyncio.create_task(self._drain(self._process.stderr, logging.WARNING)),
+        ]
+
         # Wait for the server to become healthy
         await self._wait_healthy()
 
-    async def _wait_healthy(self, retries: int = 30, delay: float = 1.0) -> None:
-        """Poll /global/health until the server responds."""
-        log.info("Waiting for OpenCode server to become healthy (max %d attempts) …", retries)
-        for attempt in range(1, retries + 1):
-            try:
-                data = await self.health()
-                if data.get("healthy"):
-                    log.info("OpenCode server healthy (attempt %d/%d)", attempt, retries)
-                    return
-                log.debug("Health check attempt %d/%d: not healthy yet", attempt, retries)
-            except (aiohttp.ClientError, ConnectionError, OSError) as exc:
-                log.debug(
-                    "Health check attempt %d/%d failed: %s",
-                    attempt, retries, exc,
-                )
-            await asyncio.sleep(delay)
+    async def warmup(self) -> None:
+        """Re-open a keep-alive connection after a long idle period.
+
+        Not needed right after startup: the successful health check in
+        ``_wait_healthy`` already leaves a connection in the pool. Once
+        pooled connections have expired, this saves the next real request
+        the TCP connect. Best effort; failures are only logged.
+        """
+        try:
+            await self.health()
+        except (aiohttp.ClientError, OSError) as exc:
+            log.warning("Connection warmup for %s failed: %s", self.base_url, exc)
+            return
+        log.debug("HTTP connection pool warmed up for %s", self.base_url)
+
+    async def _wait_healthy(self, timeout: float = 30.0, max_delay: float = 1.0) -> None:
+        """Poll /global/health until the server responds.
+
+        Retries with exponential backoff, starting at 50 ms and doubling up
+        to *max_delay*, until *timeout* seconds have elapsed.
+        """
+        log.info(
+            "Waiting for OpenCode server to become healthy (timeout %gs) …", timeout
+        )
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        delay = 0.05
+        attempt = 0
+        while True:
+            attempt += 1
+            # Cheap socket probe first; only talk HTTP once it's listening
+            if await self._tcp_ready():
+                try:
+                    # Keep each probe short so a hung one doesn't stall polling
+                    data = await asyncio.wait_for(self.health(), timeout=0.5)
+                    if data.get("healthy"):
+                        log.info("OpenCode server healthy (attempt %d)", attempt)
+                        return
+                    log.debug("Health check attempt %d: not healthy yet", attempt)
+                except asyncio.TimeoutError:
+                    log.debug("Health check attempt %d timed out", attempt)
+                except (aiohttp.ClientError, ConnectionError, OSError) as exc:
+                    log.debug("Health check attempt %d failed: %s", attempt, exc)
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 2, max_delay)
 
         raise RuntimeError(
-            f"OpenCode server did not become healthy after {retries} attempts"
+            f"OpenCode server did not become healthy within {timeout:g}s "
+            f"({attempt} attempts)"
         )
 
+    async def _tcp_ready(self) -> bool:
+        """Return True if something accepts TCP connections on our port."""
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(self.hostname, self.port), timeout=0.25
+            )
+        except (OSError, asyncio.TimeoutError):
+            return False
+        writer.close()
+        await writer.wait_closed()
+        return True
+
     async def stop_server(self) -> None:
         """Gracefully terminate the opencode serve process."""
         if self._process is None:
             log.debug("stop_server called but no process is running")
+            await self._close_http()
             return
 
         pid = self._process.pid
         log.info("Stopping OpenCode server (pid %s) …", pid)
         try:
-            self._process.send_signal(signal.SIGTERM)
-            log.debug("Sent SIGTERM to pid %s, waiting up to 10s …", pid)
-            await asyncio.wait_for(self._process.wait(), timeout=10)
+            self._signal_group(signal.SIGTERM)
+            log.debug("Sent SIGTERM to process group %s, waiting up to 2s …", pid)
+            await asyncio.wait_for(self._process.wait(), timeout=2)
             log.info("OpenCode server (pid %s) exited gracefully", pid)
         except asyncio.TimeoutError:
             log.warning("Force-killing OpenCode server (pid %s)", pid)
-            self._process.kill()
+            self._signal_group(signal.SIGKILL)
             await self._process.wait()
             log.info("OpenCode server (pid %s) killed", pid)
         finally:
             self._process = None
+            for task in self._drain_tasks:
+                task.cancel()
+            await asyncio.gather(*self._drain_tasks, return_exceptions=True)
+            self._drain_tasks = []
+
+        await self._close_http()
+
+    def _signal_group(self, sig: signal.Signals) -> None:
+        """Send *sig* to the server's whole process group."""
+        try:
+            os.killpg(self._process.pid, sig)
+        except ProcessLookupError:
+            log.debug("Process group %s already gone", self._process.pid)
 
+    @staticmethod
+    async def _drain(stream: asyncio.StreamReader, level: int) -> None:
+        """Forward a subprocess pipe to the log, line by line, until EOF."""
+        while True:
+            try:
+                line = await stream.readline()
+            except ValueError:
+                continue  # over-long line; asyncio has already discarded it
+            if not line:
+                return
+            log.log(level, "[opencode] %s", line.decode(errors="replace").rstrip())
+
+    async def _close_http(self) -> None:
+        """Close the HTTP session (the shared pool stays open)."""
         if self._http and not self._http.closed:
             await self._http.close()
             log.debug("HTTP session closed")
-            self._http = None
+        self._http = None
 
     # ------------------------------------------------------------------ #
     #  Global
@@ -142,9 +286,10 @@ class OpenCodeClient:
     async def health(self) -> dict:
         """GET /global/health"""
         log.debug("GET /global/health")
-        async with self.http.get("/global/health") as resp:
-            resp.raise_for_status()
-            data = await resp.json()
+        async with self._session().get(
+            "/global/health", timeout=_HEALTH_TIMEOUT
+        ) as resp:
+            data = _json.loads(await resp.read())
             log.debug("GET /global/health → %s", data)
             return data
 
@@ -161,44 +306,47 @@ class OpenCodeClient:
         if title:
             body["title"] = title
         log.info("POST /session (title=%r)", title)
-        async with self.http.post("/session", json=body) as resp:
-            resp.raise_for_status()
-            data = await resp.json()
+        async with self._session().post("/session", json=body) as resp:
+            data = _json.loads(await resp.read())
             session_id = data.get("id") or data.get("ID", "<unknown>")
             log.info("Session created: %s", session_id)
             return data
 
+    async def create_sessions(self, titles: list[str | None]) -> list[dict]:
+        """Create several sessions concurrently, one per entry in *titles*.
+
+        Returns the Session objects in the same order. Concurrency is bounded
+        by the connection pool's per-host limit.
+        """
+        return await asyncio.gather(*(self.create_session(t) for t in titles))
+
     async def list_sessions(self) -> list[dict]:
         """GET /session"""
         log.debug("GET /session")
-        async with self.http.get("/session") as resp:
-            resp.raise_for_status()
-            data = await resp.json()
+        async with self._session().get("/session") as resp:
+            data = _json.loads(await resp.read())
             log.debug("GET /session → %d session(s)", len(data))
             return data
 
     async def get_session(self, session_id: str) -> dict:
         """GET /session/:id"""
         log.debug("GET /session/%s", session_id[:8])
-        async with self.http.get(f"/session/{session_id}") as resp:
-            resp.raise_for_status()
-            return await resp.json()
+        async with self._session().get("/session/%s" % session_id) as resp:
+            return _json.loads(await resp.read())
 
     async def delete_session(self, session_id: str) -> bool:
         """DELETE /session/:id"""
         log.info("DELETE /session/%s", session_id[:8])
-        async with self.http.delete(f"/session/{session_id}") as resp:
-            resp.raise_for_status()
-            result = await resp.json()
+        async with self._session().delete("/session/%s" % session_id) as resp:
+            result = _json.loads(await resp.read())
             log.info("Session %s deleted", session_id[:8])
             return result
 
     async def abort_session(self, session_id: str) -> bool:
         """POST /session/:id/abort"""
         log.info("POST /session/%s/abort", session_id[:8])
-        async with self.http.post(f"/session/{session_id}/abort") as resp:
-            resp.raise_for_status()
-            result = await resp.json()
+        async with self._session().post("/session/%s/abort" % session_id) as resp:
+            result = _json.loads(await resp.read())
             log.info("Session %s aborted", session_id[:8])
             return result
 
@@ -206,6 +354,18 @@ class OpenCodeClient:
     #  Messages
     # ------------------------------------------------------------------ #
 
+    @staticmethod
+    def _build_message_body(
+        content: str, model: str | None, agent: str | None
+    ) -> bytes:
+        """Encode the JSON body shared by ``message`` and ``prompt_async``."""
+        body: dict = {"parts": [{"type": "text", "text": content}]}
+        if model:
+            body["model"] = model
+        if agent:
+            body["agent"] = agent
+        return _json.dumps(body)
+
     async def send_message(
         self,
         session_id: str,
@@ -219,23 +379,16 @@ class OpenCodeClient:
         The body uses the ``parts`` field to carry user text.
         Returns ``{ info: Message, parts: Part[] }``.
         """
-        body: dict = {
-            "parts": [{"type": "text", "text": content}],
-        }
-        if model:
-            body["model"] = model
-        if agent:
-            body["agent"] = agent
-
         log.info(
             "POST /session/%s/message (length=%d, model=%s, agent=%s)",
             session_id[:8], len(content), model, agent,
         )
-        async with self.http.post(
-            f"/session/{session_id}/message", json=body
+        async with self._session().post(
+            "/session/%s/message" % session_id,
+            data=self._build_message_body(content, model, agent),
+            headers=_JSON_HEADERS,
         ) as resp:
-            resp.raise_for_status()
-            data = await resp.json()
+            data = _json.loads(await resp.read())
             parts_count = len(data.get("parts", []))
             log.info(
                 "POST /session/%s/message → %d part(s)",
@@ -243,6 +396,16 @@ class OpenCodeClient:
             )
             return data
 
+    async def send_messages(self, pairs: list[tuple[str, str]]) -> list[dict]:
+        """Send several ``(session_id, content)`` messages concurrently.
+
+        Returns the responses in the same order as *pairs*. Concurrency is
+        bounded by the connection pool's per-host limit.
+        """
+        return await asyncio.gather(
+            *(self.send_message(sid, content) for sid, content in pairs)
+        )
+
     async def send_message_async(
         self,
         session_id: str,
@@ -252,56 +415,149 @@ class OpenCodeClient:
         agent: str | None = None,
     ) -> None:
         """POST /session/:id/prompt_async — fire-and-forget message."""
-        body: dict = {
-            "parts": [{"type": "text", "text": content}],
-        }
-        if model:
-            body["model"] = model
-        if agent:
-            body["agent"] = agent
-
         log.info(
             "POST /session/%s/prompt_async (length=%d, model=%s, agent=%s)",
             session_id[:8], len(content), model, agent,
         )
-        async with self.http.post(
-            f"/session/{session_id}/prompt_async", json=body
+        async with self._session().post(
+            "/session/%s/prompt_async" % session_id,
+            data=self._build_message_body(content, model, agent),
+            headers=_JSON_HEADERS,
         ) as resp:
-            resp.raise_for_status()
             log.debug("POST /session/%s/prompt_async → accepted", session_id[:8])
 
-    async def list_messages(
+    async def stream_message(
+        self,
+        session_id: str,
+        content: str,
+        *,
+        model: str | None = None,
+        agent: str | None = None,
+    ) -> AsyncIterator[str]:
+        """Send a message and yield the assistant's reply text as it is generated.
+
+        Subscribes to the ``GET /event`` server-sent event stream, submits the
+        message with ``prompt_async`` and yields new text from the session's
+        assistant text parts until the session goes idle. Consecutive text
+        parts are separated by a newline, as in :meth:`extract_text`.
+        """
+        log.info(
+            "Streaming reply for session %s (length=%d)", session_id[:8], len(content)
+        )
+        async with self._session().get("/event", timeout=_EVENT_TIMEOUT) as resp:
+            await self.send_message_async(
+                session_id, content, model=model, agent=agent
+            )
+
+            # Every event we act on names the session; skip decoding the rest
+            # (the stream carries all sessions' parts, tool output included)
+            session_key = session_id.encode()
+            assistant_ids: set[str] = set()
+            # part id -> number of characters already yielded
+            emitted: dict[str, int] = {}
+            async for data in self._sse_data(resp.content):
+                if session_key not in data:
+                    continue
+                event = _json.loads(data)
+                etype = event.get("type")
+                props = event.get("properties") or {}
+
+                if etype == "message.updated":
+                    info = props.get("info") or {}
+                    if info.get("sessionID") == session_id and info.get("role") == "assistant":
+                        assistant_ids.add(info.get("id"))
+                elif etype == "message.part.updated":
+                    part = props.get("part") or {}
+                    if (
+                        part.get("type") != "text"
+                        or part.get("sessionID") != session_id
+                        or part.get("messageID") not in assistant_ids
+                    ):
+                        continue
+                    text = part.get("text") or ""
+                    part_id = part.get("id")
+                    done = emitted.get(part_id)
+                    if done is None:
+                        if emitted:
+                            yield "\n"
+                        done = 0
+                    if len(text) > done:
+                        emitted[part_id] = len(text)
+                        yield text[done:]
+                    else:
+                        emitted[part_id] = done
+                elif etype == "session.error" and props.get("sessionID") == session_id:
+                    raise RuntimeError(f"OpenCode session error: {props.get('error')}")
+                elif etype == "session.idle" and props.get("sessionID") == session_id:
+                    log.debug("Session %s idle, stream complete", session_id[:8])
+                    return
+
+    async def iter_messages(
         self, session_id: str, *, limit: int | None = None
-    ) -> list[dict]:
-        """GET /session/:id/message"""
+    ) -> AsyncIterator[dict]:
+        """GET /session/:id/message, yielding messages one at a time.
+
+        With ``ijson`` installed the response is decoded incrementally, so
+        only one message is held in memory at once; otherwise the whole
+        body is read and decoded first.
+        """
         params: dict = {}
         if limit is not None:
             params["limit"] = limit
         log.debug("GET /session/%s/message (limit=%s)", session_id[:8], limit)
-        async with self.http.get(
-            f"/session/{session_id}/message", params=params
+        async with self._session().get(
+            "/session/%s/message" % session_id, params=params
         ) as resp:
-            resp.raise_for_status()
-            data = await resp.json()
+            count = 0
+            if ijson is not None:
+                async for message in ijson.items(resp.content, "item", use_float=True):
+                    count += 1
+                    yield message
+            else:
+                for message in _json.loads(await resp.read()):
+                    count += 1
+                    yield message
             log.debug(
-                "GET /session/%s/message → %d message(s)",
-                session_id[:8], len(data),
+                "GET /session/%s/message → %d message(s)", session_id[:8], count
             )
-            return data
+
+    async def list_messages(
+        self, session_id: str, *, limit: int | None = None
+    ) -> list[dict]:
+        """GET /session/:id/message"""
+        return [m async for m in self.iter_messages(session_id, limit=limit)]
 
     async def get_message(self, session_id: str, message_id: str) -> dict:
         """GET /session/:id/message/:messageID"""
         log.debug("GET /session/%s/message/%s", session_id[:8], message_id[:8])
-        async with self.http.get(
-            f"/session/{session_id}/message/{message_id}"
+        async with self._session().get(
+            "/session/%s/message/%s" % (session_id, message_id)
         ) as resp:
-            resp.raise_for_status()
-            return await resp.json()
+            return _json.loads(await resp.read())
 
     # ------------------------------------------------------------------ #
     #  Helpers
     # ------------------------------------------------------------------ #
 
+    @staticmethod
+    async def _sse_data(stream: aiohttp.StreamReader) -> AsyncIterator[bytes]:
+        """Yield the payload of every ``data:`` line in a server-sent event stream.
+
+        Lines are split here rather than with ``readline``, which is capped
+        at the reader's buffer limit; a single event can carry a whole
+        message part (e.g. a large file read) and exceed it.
+        """
+        buffer = bytearray()
+        async for chunk in stream.iter_any():
+            scan = len(buffer)
+            buffer += chunk
+            start = 0
+            while (end := buffer.find(b"\n", scan)) != -1:
+                if buffer.startswith(b"data:", start):
+                    yield bytes(buffer[start + 5:end])
+                start = scan = end + 1
+            del buffer[:start]
+
     @staticmethod
     def extract_text(response: dict) -> str:
         """Pull plain-text content out of a message response.
@@ -310,14 +566,16 @@ class OpenCodeClient:
         Parts can be text, tool-call, tool-result, etc.
         We concatenate only the text parts.
         """
-        parts = response.get("parts", [])
-        texts: list[str] = []
-        for part in parts:
-            if part.get("type") == "text":
-                texts.append(part.get("text", ""))
-        result = "\n".join(texts).strip() or "(no text in response)"
-        log.debug(
-            "extract_text: %d parts total, %d text part(s), result length=%d",
-            len(parts), len(texts), len(result),
-        )
+        parts = response.get("parts", ())
+        texts = [p["text"] for p in parts if p.get("type") == "text" and p.get("text")]
+        if len(texts) == 1:
+            # Most replies carry a single text part; skip the join
+            result = texts[0].strip() or "(no text in response)"
+        else:
+            result = "\n".join(texts).strip() or "(no text in response)"
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(
+                "extract_text: %d parts total, result length=%d",
+                len(parts), len(result),
+            )
         return result